@@ -13,21 +13,296 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import base64
+from email.charset import Charset
+from concurrent.futures import ThreadPoolExecutor
+from email.generator import BytesGenerator
 from email.mime.base import MIMEBase
-from pathlib import Path
+import functools
+import hashlib
+import io
+import os
 import re
-from typing import Any, Callable, List, Literal, Self, Set
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Self,
+    Tuple,
+)
 import ssl
+import stat
+import threading
+import time
 from manokit.exceptions import (
     AttachmentError,
     EmailError,
     NotAValidEmailAddressError,
 )
 import smtplib
-import datetime
+import socket
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email import encoders
+from email.mime.nonmultipart import MIMENonMultipart
+from email.utils import formatdate
+
+# '\w' already covers digits, letters of either case and the underscore, and
+# the dots that separate domain labels are not part of any character class, so
+# the pattern cannot backtrack on its own input
+_EMAIL_RE = re.compile(r"[-+.\w]+@[-+\w]+(?:\.\w+)+")
+
+# UTF-8 without a transfer encoding, for hosts that accept 8-bit content.
+# Otherwise non-ASCII bodies are base64-encoded, which makes them a third larger
+_UTF8_8BIT = Charset("utf-8")
+_UTF8_8BIT.body_encoding = None
+
+
+def _fits_8bit(text: str) -> bool:
+    """Checks whether a text can be sent without a transfer encoding, i.e. none of its lines
+    is longer than 998 bytes (RFC 5322)
+
+    Args:
+        text (str): a text
+
+    Returns:
+        bool: True if the text can be sent as is, False otherwise
+    """
+    lines = text.encode("utf-8").splitlines()
+    return max(map(len, lines), default=0) <= 998
+
+
+@functools.lru_cache(maxsize=8192)
+def _validate_email(address: str) -> bool:
+    return _EMAIL_RE.fullmatch(address) is not None
+
+
+# How long (in seconds) an SMTP session may stay idle before it is checked
+# with a NOOP command. Servers usually close idle sessions after a few minutes
+_IDLE_CHECK_AFTER = 30
+
+# SMTP reply codes that mean that the same command may succeed later (RFC 5321)
+_TRANSIENT_CODES = frozenset((421, 450, 454))
+_SEND_RETRIES = 3
+# Delay before the first retry, in seconds. Doubled after every attempt
+_RETRY_BACKOFF = 1.0
+
+_VALID_SCOPES = frozenset(("all", "author", "recipients", "cc", "bcc"))
+
+# Marks the place of the body in a frozen email. Cannot appear in base64-encoded parts
+_BODY_TOKEN = "\x00MANOKIT_BODY\x00"
+
+_DEFAULT_SSL_CTX = None
+
+
+def _ssl_ctx() -> ssl.SSLContext:
+    """Returns the default SSL context, creating it on the first call. Loading the system's CA certificates
+    is slow, so the context is shared by every Email object that has no context of its own. It is never
+    handed out through Email.ssl_context, so it cannot be changed for all of them at once
+
+    Returns:
+        SSLContext: the default SSL context
+    """
+    global _DEFAULT_SSL_CTX
+
+    ctx = _DEFAULT_SSL_CTX
+    if ctx is None:
+        ctx = _DEFAULT_SSL_CTX = ssl.create_default_context()
+
+    return ctx
+
+
+# base64.encodebytes() splits its output into lines of 76 characters, i.e. 57 input bytes.
+# Chunks that are a multiple of 57 bytes are encoded into whole lines, so they can be concatenated
+_B64_CHUNK_SIZE = 57 * 1024
+
+
+def _build_part(path: str) -> MIMEBase:
+    """Reads a file and encodes it as a base64 attachment
+
+    Args:
+        path (str): an absolute POSIX-style path to the file
+
+    Returns:
+        MIMEBase: a MIME part that can be attached to an email
+    """
+    buf = io.BytesIO()
+
+    # The file is encoded chunk by chunk, so only the encoded copy is ever fully kept in memory
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_B64_CHUNK_SIZE), b""):
+            buf.write(base64.encodebytes(chunk))
+
+    part = MIMEBase("application", "octet-stream")
+    part.set_payload(buf.getvalue().decode("ascii"))
+    part["Content-Transfer-Encoding"] = "base64"
+    part.add_header(
+        "Content-Disposition",
+        f"attachment; filename={os.path.basename(path)}",
+    )
+
+    return part
+
+
+def _serialize(message: MIMEMultipart) -> bytes:
+    """Serializes a message into the bytes that are sent to the SMTP host. smtplib only converts line endings
+    of messages passed as strings, so the lines are ended with CRLF here, as required by RFC 5321
+
+    Args:
+        message (MIMEMultipart): a message
+
+    Returns:
+        bytes: the serialized message
+    """
+    buf = io.BytesIO()
+    BytesGenerator(buf, mangle_from_=False).flatten(message, linesep="\r\n")
+
+    return buf.getvalue()
+
+
+def _is_alive(serv: smtplib.SMTP) -> bool:
+    """Checks whether an SMTP session is still usable by sending a NOOP command
+
+    Args:
+        serv (SMTP | SMTP_SSL): an SMTP session
+
+    Returns:
+        bool: True if the server has replied with 250, False otherwise
+    """
+    try:
+        code, _ = serv.noop()
+    except (smtplib.SMTPException, OSError):
+        return False
+
+    return code == 250
+
+
+# (host, port, username, SHA-256 digest of the password, use_starttls, id() of the SSL context)
+# of a pooled SMTP session
+_PoolKey = Tuple[str, int, str, bytes, bool, int]
+
+
+def _is_transient(error: smtplib.SMTPException) -> bool:
+    """Checks whether a failed SMTP transaction can be retried
+
+    Args:
+        error (SMTPException): an error raised during the transaction
+
+    Returns:
+        bool: True if every reply code of the error is transient, False otherwise
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(
+            code in _TRANSIENT_CODES for code, _ in error.recipients.values()
+        )
+
+    return error.smtp_code in _TRANSIENT_CODES
+
+
+def _date_header() -> bytes:
+    """Returns a Date header with the current time, prepended to serialized messages right before sending
+
+    Returns:
+        bytes: the header line
+    """
+    return f"Date: {formatdate(localtime=True)}\r\n".encode("ascii")
+
+
+class SMTPPool:
+    """A thread-safe storage of authenticated SMTP sessions that can be reused by multiple Email objects
+
+    Sessions are keyed by (host, port, username, password digest, use_starttls, SSL context), and several idle sessions can be kept for the same key,
+    so Email objects that send from different threads each get their own session. A session is handed out to only
+    one Email object at a time, and is checked with a NOOP command before being reused, so a session that was dropped
+    by the server is never returned. Sessions that have sent too many messages are closed instead of being reused,
+    because SMTP providers limit how many messages may be sent over one connection.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_idle_sessions: int = 5,
+        max_messages_per_session: int = 5000,
+    ) -> None:
+        """Creates an SMTPPool object.
+
+        Args:
+            max_idle_sessions (int, optional): How many idle sessions can be kept for the same key. Defaults to 5.
+            max_messages_per_session (int, optional): How many messages can be sent over one session before it is closed. Defaults to 5000.
+        """
+        self.max_idle_sessions = max_idle_sessions
+        self.max_messages_per_session = max_messages_per_session
+
+        self._sessions: "Dict[_PoolKey, List[Tuple[smtplib.SMTP, int]]]" = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _quit(serv: smtplib.SMTP) -> None:
+        try:
+            serv.quit()
+        except (smtplib.SMTPException, OSError):
+            serv.close()
+
+    def acquire(self, key: _PoolKey) -> "Tuple[smtplib.SMTP, int] | None":
+        """Takes a live session out of the pool
+
+        Args:
+            key (Tuple[str, int, str, bytes, bool, int]): (host, port, username, password digest, use_starttls, id() of the SSL context) of the session
+
+        Returns:
+            Tuple[SMTP | SMTP_SSL, int] | None: an authenticated session and the number of messages it has sent,
+            or None if there is no live session for this key
+        """
+        while True:
+            with self._lock:
+                idle = self._sessions.get(key)
+
+                if not idle:
+                    return None
+
+                serv, messages = idle.pop()
+
+            if _is_alive(serv):
+                return serv, messages
+
+            serv.close()
+
+    def release(
+        self,
+        key: _PoolKey,
+        serv: smtplib.SMTP,
+        messages: int = 0,
+    ) -> None:
+        """Puts a session back into the pool so it can be reused later. The session is closed instead
+        if it has reached the message limit, or if the pool already keeps enough idle sessions for this key
+
+        Args:
+            key (Tuple[str, int, str, bytes, bool, int]): (host, port, username, password digest, use_starttls, id() of the SSL context) of the session
+            serv (SMTP | SMTP_SSL): an authenticated session
+            messages (int, optional): How many messages the session has sent. Defaults to 0.
+        """
+        if messages < self.max_messages_per_session:
+            with self._lock:
+                idle = self._sessions.setdefault(key, [])
+
+                if len(idle) < self.max_idle_sessions:
+                    idle.append((serv, messages))
+                    return
+
+        self._quit(serv)
+
+    def close(self) -> None:
+        """Closes every session stored in the pool"""
+        with self._lock:
+            sessions = [
+                serv for idle in self._sessions.values() for serv, _ in idle
+            ]
+            self._sessions.clear()
+
+        for serv in sessions:
+            self._quit(serv)
 
 
 class Email:
@@ -40,12 +315,12 @@ class Email:
         * email_handler (SMTP | SMTP_SSL): An object that actually responsible for sending emails. It is
         noted that Manokit only supports encrypted connections with either SSL or TLS, so if you want to use Manokit for unencrypted connections,
         you can override this object, but in that case the library's functions may be altered/unavailable
-        ssl_context (SSLContext): An SSL context used for encryption. Can be overwritten with a custom context
+        ssl_context (SSLContext | None): An SSL context used for encryption. Defaults to None, in which case a default context with certificate verification is used. Can be overwritten with a custom context
 
         * author (str): An email address which sends an email (an email's author). It is set during authentication and defaults to the username.
         * subject (str): Email's subject. Defaults to '<no subject>'
         * body (str): Email's body. Defaults to '<no body>'
-        * attachments (Set[Path]): a set of pathlib.Path objects that point to the files that need to be attached to the email
+        * attachments (Dict[str, int]): a dictionary that maps absolute POSIX-style paths of the files that need to be attached to the email to their sizes in bytes
 
         * rec (Set[str]): a set of email addresses which will receive an email
         * cc (Set[str]): a set of email addresses that will be CC'd into the email
@@ -53,10 +328,12 @@ class Email:
 
         * FILESIZE_LIMIT (int): A limit on total size of attachments.
         * available_filesize (int): How much free space is available for attachments
-        * timestamp (datetime.datetime): A timestamp of when the email was created
         * email_validators (Dict[str, (str) -> bool]): a dictionary that maps different scopes to different validators
     """
 
+    # Shared by every Email object that logs in with 'use_pool=True'
+    _pool = SMTPPool()
+
     # Maybe we can add an ability for the end user to use custom validators?
     def _check_if_valid_email_address(
         self,
@@ -75,9 +352,9 @@ class Email:
         return self.email_validators[scope](address)
 
     def _default_email_validator(self, address: str) -> bool:
-        """Checks whether an email address is valid. This validator can be overridden by the user.
+        r"""Checks whether an email address is valid. This validator can be overridden by the user.
 
-        By default, Manokit uses a regular expression (this one: '^[-_+.\d\w]+@[-_+\d\w]+(?:\.{1}[\w]+)+$') to verify an email.
+        By default, Manokit matches the whole address against a regular expression (this one: '[-+.\w]+@[-+\w]+(?:\.\w+)+') to verify an email.
 
         Args:
             address (str): an email address
@@ -85,13 +362,7 @@ class Email:
         Returns:
             bool: True if the email address is valid, False otherwise
         """
-        return bool(
-            re.fullmatch(
-                "^[-_+.\d\w]+@[-_+\d\w]+(?:\.{1}[\w]+)+$",
-                address,
-                re.IGNORECASE,
-            )
-        )
+        return _validate_email(address)
 
     def __init__(
         self, smtp_host: str, smtp_port: int, *, filesize_limit: int = 26214400
@@ -107,17 +378,25 @@ class Email:
         self.port = smtp_port
 
         self.email_handler = None
-        self.ssl_context = ssl.create_default_context()
+        self._pool_key = None
+        # Kept so that a session closed by the server can be reopened
+        self._credentials: "Tuple[str, str, bool] | None" = None
+        self._last_used = 0.0
+        # How many messages have been sent over the current session
+        self._session_messages = 0
+        self.ssl_context: "ssl.SSLContext | None" = None
 
         self.author = None
 
         self.subject = "<no subject>"
         self.body = "<no body>"
-        self.attachments: "Set[Path]" = set()
+        self.attachments: "Dict[str, int]" = {}
 
         self.rec = set()
         self.cc = set()
         self.bcc = set()
+        # The last message built by send(), without the Date header, and what it was built from
+        self._message_cache: "Tuple[tuple, bytes] | None" = None
 
         self.FILESIZE_LIMIT = filesize_limit
         self.available_filesize = filesize_limit
@@ -128,15 +407,13 @@ class Email:
             "bcc": self._default_email_validator,
         }
 
-        # Maybe move it to send() function because it is used only there
-        self.timestamp = datetime.datetime.now()
-
     def login(
         self,
         username: str,
         password: str,
         *,
         use_starttls: bool = True,
+        use_pool: bool = False,
     ) -> Self:
         """Authenticates with the SMTP host
 
@@ -144,6 +421,9 @@ class Email:
             username (str): user's email address
             password (str): password to login. Google's app passwords are supported
             use_starttls (bool, optional): Whether to use STARTTLS over SSL or not. Defaults to True.
+            use_pool (bool, optional): Whether to reuse an already authenticated session from the connection pool.
+            A session is only reused if it was opened with the same password and SSL context.
+            If enabled, logout() returns the session to the pool instead of closing it. Defaults to False.
 
         Returns:
             Self: Returns a modified instance for method chaining
@@ -155,29 +435,175 @@ class Email:
 
         if not self._check_if_valid_email_address(username, "author"):
             raise NotAValidEmailAddressError(
-                f"address {username} has failed validation"
+                "address {address} has failed validation", address=username
             )
 
+        # A pooled session is only handed to a login that would have opened it itself, so a wrong password
+        # or a stricter SSL context never gets someone else's session. A pooled session keeps its context
+        # alive, so the context's id() cannot be taken by another object while the session is in the pool
+        key = (
+            self.host,
+            self.port,
+            username,
+            hashlib.sha256(password.encode("utf-8")).digest(),
+            use_starttls,
+            id(self._get_ssl_context()),
+        )
+        pooled = self._pool.acquire(key) if use_pool else None
+
+        if pooled is None:
+            serv = self._connect(username, password, use_starttls)
+            messages = 0
+        else:
+            serv, messages = pooled
+
+        self.email_handler = serv
+        self._session_messages = messages
+        self._pool_key = key if use_pool else None
+        self._credentials = (username, password, use_starttls)
+        self._last_used = time.monotonic()
+        self.author = username
+
+        return self
+
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        """Returns the SSL context used for new sessions
+
+        Returns:
+            SSLContext: ssl_context if it is set, the default SSL context otherwise
+        """
+        if self.ssl_context is None:
+            return _ssl_ctx()
+
+        return self.ssl_context
+
+    def _connect(
+        self, username: str, password: str, use_starttls: bool
+    ) -> smtplib.SMTP:
+        """Opens and authenticates a new SMTP session
+
+        Args:
+            username (str): user's email address
+            password (str): password to login
+            use_starttls (bool): Whether to use STARTTLS over SSL or not
+
+        Returns:
+            SMTP | SMTP_SSL: an authenticated session
+
+        Raises:
+            SMTPAuthenticationError: the authentication process could not be completed
+        """
+        context = self._get_ssl_context()
+
         if use_starttls:
             serv = smtplib.SMTP(self.host, self.port)
-            serv.starttls(context=self.ssl_context)
+            serv.starttls(context=context)
         else:
             serv = smtplib.SMTP_SSL(
                 host=self.host,
                 port=self.port,
-                context=self.ssl_context,
+                context=context,
             )
 
+        # Disable Nagle's algorithm, so the end of a message is not held back
+        # while the server delays its ACK for the previous segments
+        try:
+            serv.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+
         serv.login(user=username, password=password)
 
-        self.email_handler = serv
-        self.author = username
+        return serv
 
-        return self
+    def _ensure_connected(self) -> None:
+        """Makes sure that the SMTP session can be used for sending. A new session is opened if the current one
+        has been closed, or if it has been idle for a while and does not reply to a NOOP command.
+        Sessions that were not opened by login() are used as is, because they cannot be reopened.
+        EHLO is sent if it has not been yet, so the host's extensions are known before the message is built
+
+        Raises:
+            EmailError: if the user has not logged in
+        """
+        handler = self.email_handler
+
+        if handler is None:
+            raise EmailError("cannot send an email before logging in")
+
+        if self._credentials is not None and self._close_if_stale(handler):
+            self._reconnect()
+
+        self.email_handler.ehlo_or_helo_if_needed()
+
+    def _close_if_stale(self, handler: smtplib.SMTP) -> bool:
+        """Closes the SMTP session if it can no longer be used for sending
+
+        Args:
+            handler (SMTP | SMTP_SSL): the current SMTP session
+
+        Returns:
+            bool: True if the session is closed and has to be reopened, False otherwise
+        """
+        if handler.sock is None:
+            return True
+
+        if self._session_messages >= self._pool.max_messages_per_session:
+            SMTPPool._quit(handler)
+            return True
+
+        if time.monotonic() - self._last_used < _IDLE_CHECK_AFTER:
+            return False
+
+        if _is_alive(handler):
+            return False
+
+        handler.close()
+        return True
+
+    def _reconnect(self) -> None:
+        """Replaces the current SMTP session with a new one, opened with the same credentials"""
+        self.email_handler = self._connect(*self._credentials)
+        self._session_messages = 0
 
     def logout(self) -> None:
-        """Closes the SMTP session"""
-        self.email_handler.quit()
+        """Closes the SMTP session. If the session came from the connection pool, it is returned to the pool instead.
+        This has no effect if there is no open session"""
+        if self.email_handler is None:
+            return
+
+        if self._pool_key is not None:
+            self._pool.release(
+                self._pool_key, self.email_handler, self._session_messages
+            )
+            self._pool_key = None
+        else:
+            # The session may have already been closed by the server
+            SMTPPool._quit(self.email_handler)
+
+        self.email_handler = None
+        self._credentials = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.logout()
+
+    @classmethod
+    def close_pool(cls) -> None:
+        """Closes every SMTP session kept in the connection pool"""
+        cls._pool.close()
+
+    def _is_known(self, address: str) -> bool:
+        """Checks whether an address is already a recipient, or is CC'd or BCC'd
+
+        Args:
+            address (str): an email address
+
+        Returns:
+            bool: True if the address has already been added, False otherwise
+        """
+        return address in self.rec or address in self.cc or address in self.bcc
 
     def add_recipient(self, address: str) -> Self:
         """Adds a recipient that will receive an email. This will have no effect if the address is already in CC or BCC lists
@@ -191,13 +617,41 @@ class Email:
         Raises:
             NotAValidEmailAddressError: the address email is invalid
         """
+        if self._is_known(address):
+            return self
+
         if not self._check_if_valid_email_address(address, "recipients"):
             raise NotAValidEmailAddressError(
-                f"address {address} has failed validation"
+                "address {address} has failed validation", address=address
             )
 
-        if (address not in self.cc) and (address not in self.bcc):
-            self.rec.add(address)
+        self.rec.add(address)
+
+        return self
+
+    def add_recipients(self, addresses: "Iterable[str]") -> Self:
+        """Adds multiple recipients that will receive an email. Every address is validated before any of them is added,
+        so if one of them is invalid, none are added. Addresses that are already in recipients, CC or BCC lists are skipped
+
+        Args:
+            addresses (Iterable[str]): Email addresses
+
+        Returns:
+            Self: Returns a modified instance for method chaining
+
+        Raises:
+            NotAValidEmailAddressError: one of the addresses is invalid
+        """
+        new = [a for a in dict.fromkeys(addresses) if not self._is_known(a)]
+
+        for address in new:
+            if not self._check_if_valid_email_address(address, "recipients"):
+                raise NotAValidEmailAddressError(
+                    "address {address} has failed validation", address=address
+                )
+
+        if new:
+            self.rec.update(new)
 
         return self
 
@@ -213,13 +667,15 @@ class Email:
         Raises:
             NotAValidEmailAddressError: the address email is invalid
         """
+        if self._is_known(address):
+            return self
+
         if not self._check_if_valid_email_address(address, "cc"):
             raise NotAValidEmailAddressError(
-                f"address {address} has failed validation"
+                "address {address} has failed validation", address=address
             )
 
-        if (address not in self.rec) and (address not in self.bcc):
-            self.cc.add(address)
+        self.cc.add(address)
 
         return self
 
@@ -235,13 +691,15 @@ class Email:
         Raises:
             NotAValidEmailAddressError: the address email is invalid
         """
+        if self._is_known(address):
+            return self
+
         if not self._check_if_valid_email_address(address, "bcc"):
             raise NotAValidEmailAddressError(
-                f"address {address} has failed validation"
+                "address {address} has failed validation", address=address
             )
 
-        if (address not in self.rec) and (address not in self.cc):
-            self.bcc.add(address)
+        self.bcc.add(address)
 
         return self
 
@@ -290,20 +748,20 @@ class Email:
                 * bcc - use this email for validating only the addresses that will be BCC'd into the email
 
         Raises:
-            ValueError: if provided scope is not in the list of allowed scopes
+            ValueError: if any of the provided scopes is not in the list of allowed scopes. In that case no validator is changed
         """
 
+        bad = [s for s in scopes if s not in _VALID_SCOPES]
+        if bad:
+            raise ValueError(f"invalid scopes: {bad}")
+
         if "all" in scopes:
-            self.email_validators["author"] = validator
-            self.email_validators["recipients"] = validator
-            self.email_validators["cc"] = validator
-            self.email_validators["bcc"] = validator
+            self.email_validators = dict.fromkeys(
+                ("author", "recipients", "cc", "bcc"), validator
+            )
             return
 
         for s in scopes:
-            if s not in ["all", "author", "recipients", "cc", "bcc"]:
-                raise ValueError(f"scope '{s}' if invalid")
-
             self.email_validators[s] = validator
 
     def add_attachment(self, path: str) -> Self:
@@ -320,76 +778,475 @@ class Email:
             Self: Returns a modified instance for method chaining
         """
 
-        p = Path(path)
+        # Unlike os.path.abspath(), joining does not collapse '..' segments, which would point elsewhere
+        # if they come after a symbolic link. An absolute path is returned by os.path.join() as is
+        key = os.path.join(os.getcwd(), path).replace(os.sep, "/")
 
-        if p in self.attachments:
-            return
+        if key in self.attachments:
+            return self
 
-        if p.stat().st_size == 0:
-            return
+        st = os.stat(key)
+
+        if st.st_size == 0:
+            return self
 
-        if not p.is_file():
+        if not stat.S_ISREG(st.st_mode):
             raise AttachmentError(
-                f"cannot attach {p.as_posix()} because it is not a file"
+                "cannot attach {path} because it is not a file", path=key
             )
 
-        rem_filesize = self.available_filesize - p.stat().st_size
+        rem_filesize = self.available_filesize - st.st_size
 
         if rem_filesize < 0:
             raise AttachmentError(
-                f"cannot add an attachment; the combines size of all attachments is larger than the filesize limit ({self.FILESIZE_LIMIT} bytes)"
+                "cannot add an attachment; the combines size of all attachments is larger than the filesize limit ({limit} bytes)",
+                limit=self.FILESIZE_LIMIT,
             )
 
-        self.attachments.add(p)
+        self.attachments[key] = st.st_size
         self.available_filesize = rem_filesize
 
         return self
 
-    def send(self) -> Self:
-        """Sends an email.
+    def _supports_8bit(self) -> bool:
+        """Checks whether the SMTP host accepts messages with 8-bit content (RFC 6152)
+
+        Returns:
+            bool: True if the host advertises the 8BITMIME extension, False otherwise
+        """
+        handler = self.email_handler
+        return handler.does_esmtp and handler.has_extn("8bitmime")
+
+    def _reset_session(self, code: int) -> None:
+        """Aborts the current SMTP transaction after the server has rejected a command
+
+        Args:
+            code (int): the server's reply code. 421 means that the server is closing the connection
+        """
+        if code == 421:
+            self.email_handler.close()
+            return
+
+        try:
+            self.email_handler.rset()
+        except smtplib.SMTPServerDisconnected:
+            pass
+
+    def _send_envelope(
+        self, rcpts: "List[str]", options: "List[str]"
+    ) -> "List[Tuple[int, bytes]]":
+        """Sends the MAIL FROM and RCPT TO commands one by one, waiting for a reply to each of them
+
+        Args:
+            rcpts (List[str]): the addresses that will receive the message
+            options (List[str]): ESMTP options of the MAIL FROM command
+
+        Returns:
+            List[Tuple[int, bytes]]: the reply to MAIL FROM, followed by the replies to RCPT TO.
+            Stops after a rejected MAIL FROM or when the server closes the connection
+        """
+        handler = self.email_handler
+        replies = [handler.mail(self.author, options)]
+
+        if replies[0][0] != 250:
+            return replies
+
+        for address in rcpts:
+            replies.append(handler.rcpt(address))
+
+            if replies[-1][0] == 421:
+                break
+
+        return replies
+
+    def _send_envelope_pipelined(
+        self, rcpts: "List[str]", options: "List[str]"
+    ) -> "List[Tuple[int, bytes]]":
+        """Sends the MAIL FROM and all RCPT TO commands at once and only then reads the replies (RFC 2920).
+        This way the whole envelope takes a single round trip, no matter how many recipients there are
+
+        Args:
+            rcpts (List[str]): the addresses that will receive the message
+            options (List[str]): ESMTP options of the MAIL FROM command
+
+        Returns:
+            List[Tuple[int, bytes]]: the reply to MAIL FROM, followed by the replies to RCPT TO.
+            Stops when the server closes the connection
+
+        Raises:
+            ValueError: an address contains a line break
+        """
+        handler = self.email_handler
+        optionlist = "".join(f" {option}" for option in options)
+
+        commands = [f"mail FROM:{smtplib.quoteaddr(self.author)}{optionlist}"]
+        commands.extend(
+            f"rcpt TO:{smtplib.quoteaddr(address)}" for address in rcpts
+        )
+
+        if any("\r" in cmd or "\n" in cmd for cmd in commands):
+            raise ValueError(
+                "command and arguments contain prohibited newline characters"
+            )
+
+        handler.send("".join(f"{cmd}\r\n" for cmd in commands))
+
+        replies = []
+        for _ in commands:
+            replies.append(handler.getreply())
+
+            if replies[-1][0] == 421:
+                break
+
+        return replies
+
+    def _transact(
+        self, payload: bytes, rcpts: "List[str]"
+    ) -> "Dict[str, Tuple[int, bytes]]":
+        """Delivers a serialized message to all recipients in a single SMTP transaction
+
+        Args:
+            payload (bytes): the message, as produced by a BytesGenerator
+            rcpts (List[str]): the addresses that will receive the message
+
+        Returns:
+            Dict[str, Tuple[int, bytes]]: the recipients that were refused by the server, mapped to the server's reply
+
+        Raises:
+            SMTPSenderRefused: the server has refused the author's address
+            SMTPRecipientsRefused: the server has refused every recipient
+            SMTPDataError: the server has refused the message
+        """
+        handler = self.email_handler
+        handler.ehlo_or_helo_if_needed()
+
+        options = []
+        if handler.does_esmtp and handler.has_extn("size"):
+            options.append(f"size={len(payload)}")
+
+        if self._supports_8bit():
+            options.append("body=8bitmime")
+
+        if handler.does_esmtp and handler.has_extn("pipelining"):
+            replies = self._send_envelope_pipelined(rcpts, options)
+        else:
+            replies = self._send_envelope(rcpts, options)
+
+        code, resp = replies[0]
+        if code != 250:
+            self._reset_session(code)
+            raise smtplib.SMTPSenderRefused(code, resp, self.author)
+
+        errs = {}
+        for address, (code, resp) in zip(rcpts, replies[1:]):
+            if code not in (250, 251):
+                errs[address] = (code, resp)
+
+            if code == 421:
+                self._reset_session(code)
+                raise smtplib.SMTPRecipientsRefused(errs)
+
+        if len(errs) == len(rcpts):
+            self._reset_session(code)
+            raise smtplib.SMTPRecipientsRefused(errs)
+
+        try:
+            code, resp = handler.data(payload)
+        except smtplib.SMTPDataError as e:
+            # Raised when the DATA command itself is refused, which leaves the transaction open
+            self._reset_session(e.smtp_code)
+            raise
+
+        if code != 250:
+            self._reset_session(code)
+            raise smtplib.SMTPDataError(code, resp)
+
+        return errs
+
+    def _deliver(self, payload: bytes, rcpts: "List[str]") -> None:
+        """Delivers a serialized message and makes sure that every recipient has accepted it
+
+        Args:
+            payload (bytes): the message, as produced by a BytesGenerator
+            rcpts (List[str]): the addresses that will receive the message
+
+        Raises:
+            EmailError: if the message was refused for one of the recipients
+        """
+        # Transient failures (the server is busy, a mailbox is temporarily unavailable, etc)
+        # are retried with an exponential backoff
+        attempt = 0
+        reconnected = False
+
+        while True:
+            try:
+                errs = self._transact(payload, rcpts)
+                break
+            except smtplib.SMTPServerDisconnected:
+                # The session was dropped without a reply, so it is reopened and the message is sent once more
+                if reconnected or self._credentials is None:
+                    raise
+
+                reconnected = True
+                self.email_handler.close()
+                self._reconnect()
+            except (
+                smtplib.SMTPResponseException,
+                smtplib.SMTPRecipientsRefused,
+            ) as e:
+                if attempt == _SEND_RETRIES or not _is_transient(e):
+                    raise
+
+                # The server closes the session after replying with 421. A session that was not opened
+                # by login() cannot be reopened, so the server's reply is reported instead of retrying
+                if (
+                    self.email_handler.sock is None
+                    and self._credentials is None
+                ):
+                    raise
+
+                time.sleep(_RETRY_BACKOFF * 2**attempt)
+                attempt += 1
+
+                self._ensure_connected()
+            finally:
+                self._last_used = time.monotonic()
+
+        self._session_messages += 1
+
+        if errs:
+            addr, (code, msg) = next(iter(errs.items()))
+            raise EmailError(
+                "message to {addr} failed (code {code}): {msg}",
+                addr=addr,
+                code=code,
+                msg=msg,
+            )
+
+    def _recipients(self) -> "List[str]":
+        """Returns every address the email will be delivered to, and makes sure there is at least one recipient
 
         Raises:
             EmailError: if the recipient list is empty
 
         Returns:
-            Self: Returns a modified instance for method chaining
+            List[str]: recipients, followed by CC'd and BCC'd addresses
         """
         if len(self.rec) < 1:
             raise EmailError(
                 "cannot send an email because there is no one to receive it"
             )
 
+        # The sets never share an address, so there is nothing to deduplicate
+        rcpts = list(self.rec)
+        rcpts.extend(self.cc)
+        rcpts.extend(self.bcc)
+
+        return rcpts
+
+    def _check_attachments(self) -> "Tuple[Tuple[str, int, int, int], ...]":
+        """Makes sure that every attachment is still a file, and that they still fit in the filesize limit.
+        This is done before any of the files is read, so an invalid attachment does not waste any encoding work
+
+        Raises:
+            AttachmentError: if an attachment no longer exists or is not a file
+            AttachmentError: if the combined size of the attachments is now larger than the filesize limit
+
+        Returns:
+            Tuple[Tuple[str, int, int, int], ...]: (path, modification time in nanoseconds, size, inode number) of every attachment
+        """
+        stamps = []
+        total_size = 0
+
+        for path in self.attachments:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                raise AttachmentError(
+                    "cannot attach {path} because it no longer exists",
+                    path=path,
+                ) from None
+
+            if not stat.S_ISREG(st.st_mode):
+                raise AttachmentError(
+                    "cannot attach {path} because it is not a file", path=path
+                )
+
+            total_size += st.st_size
+            # Modification times can be coarse (e.g. on network filesystems), so a file that was rewritten
+            # or replaced right after being sent is detected by its size and inode as well
+            stamps.append((path, st.st_mtime_ns, st.st_size, st.st_ino))
+
+        if total_size > self.FILESIZE_LIMIT:
+            raise AttachmentError(
+                "cannot send an email; the combined size of all attachments is larger than the filesize limit ({limit} bytes)",
+                limit=self.FILESIZE_LIMIT,
+            )
+
+        return tuple(stamps)
+
+    def _build_message(self, body: MIMEBase) -> MIMEMultipart:
+        """Builds a message with everything but the Date header. BCC'd addresses are only used as envelope recipients,
+        so they do not appear in the message
+
+        Args:
+            body (MIMEBase): a MIME part that contains the email's body
+
+        Returns:
+            MIMEMultipart: the message
+        """
         message = MIMEMultipart()
         message["Subject"] = self.subject
         message["From"] = self.author
-        message["Date"] = self.timestamp.strftime("%d/%m/%Y %H:%M:%S")
+
+        message["To"] = ",".join(self.rec)
         message["Cc"] = ",".join(self.cc)
+        message.attach(body)
 
-        # You can use text/plain, but using text/html gives you more flexibility
-        message.attach(MIMEText(self.body, "html"))
+        if self.attachments:
+            # Files are read and encoded in parallel, but the message itself is not thread-safe,
+            # so the parts are attached one by one afterwards
+            with ThreadPoolExecutor(
+                max_workers=min(8, len(self.attachments))
+            ) as executor:
+                parts = list(executor.map(_build_part, self.attachments))
 
-        for file in self.attachments:
-            part = MIMEBase("application", "octet-stream")
-            part.add_header(
-                "Content-Disposition",
-                f"attachment; filename={file.name}",
-            )
+            for part in parts:
+                message.attach(part)
+
+        return message
 
-            with file.open("rb") as f:
-                part.set_payload(f.read())
-                encoders.encode_base64(part)
+    def send(self) -> Self:
+        """Sends an email. The serialized message is kept until the next call, so sending the same email again
+        does not build it once more. It is as large as the email with its attachments encoded in base64,
+        so call clear_cache() if the email will not be sent again but will be kept around
+
+        Raises:
+            EmailError: if the recipient list is empty, the user has not logged in, or the message was refused for one of the recipients
+            AttachmentError: if an attachment has been removed, or the attachments have grown larger than the filesize limit
 
-            message.attach(part)
+        Returns:
+            Self: Returns a modified instance for method chaining
+        """
+        rcpts = self._recipients()
+        attachments = self._check_attachments()
+        self._ensure_connected()
 
-        errs = self.email_handler.sendmail(
+        eight_bit = self._supports_8bit() and _fits_8bit(self.body)
+        key = (
             self.author,
-            list(self.rec | self.cc | self.bcc),
-            message.as_string(),
+            self.subject,
+            self.body,
+            frozenset(self.rec),
+            frozenset(self.cc),
+            eight_bit,
+            attachments,
         )
 
-        if errs:
+        # Sending the same email again reuses the serialized message, unless its contents, its recipients
+        # or the attached files have changed since
+        if self._message_cache is None or self._message_cache[0] != key:
+            # You can use text/plain, but using text/html gives you more flexibility
+            if eight_bit:
+                body = MIMEText(self.body, "html", _UTF8_8BIT)
+            else:
+                body = MIMEText(self.body, "html")
+
+            message = _serialize(self._build_message(body))
+            self._message_cache = (key, message)
+
+        self._deliver(_date_header() + self._message_cache[1], rcpts)
+
+        return self
+
+    def clear_cache(self) -> Self:
+        """Drops the serialized message kept by send() to free the memory it takes up
+
+        Returns:
+            Self: Returns a modified instance for method chaining
+        """
+        self._message_cache = None
+
+        return self
+
+    def freeze(self) -> "FrozenEmail":
+        """Serializes everything except the body once, so that the email can be sent many times with different bodies
+        without building the message and encoding the attachments again. Changes made to the email after it was frozen
+        do not affect the frozen email.
+
+        Raises:
+            EmailError: if the recipient list is empty, or the headers contain the body placeholder
+            AttachmentError: if an attachment has been removed, or the attachments have grown larger than the filesize limit
+
+        Returns:
+            FrozenEmail: the frozen email
+        """
+        rcpts = self._recipients()
+        self._check_attachments()
+
+        body = MIMENonMultipart("text", "html", charset="utf-8")
+        body["Content-Transfer-Encoding"] = "base64"
+        body.set_payload(_BODY_TOKEN)
+
+        parts = _serialize(self._build_message(body)).split(
+            _BODY_TOKEN.encode("ascii")
+        )
+
+        if len(parts) != 2:
             raise EmailError(
-                f"message to {errs.keys()[0]} failed (code {errs.get(errs.keys()[0])[0]}): {errs.get(errs.keys()[0])[1]}"
+                "cannot freeze an email whose headers contain the body placeholder"
             )
 
+        return FrozenEmail(self, parts[0], parts[1], list(rcpts))
+
+
+class FrozenEmail:
+    """An email that has been serialized once and can be sent many times with different bodies. Created by Email.freeze()
+
+    Attributes:
+        * email (Email): the email that has been frozen. Its SMTP session is used for sending
+    """
+
+    def __init__(
+        self, email: Email, prefix: bytes, suffix: bytes, rcpts: "List[str]"
+    ) -> None:
+        """Creates a FrozenEmail object.
+
+        Args:
+            email (Email): the email that has been frozen
+            prefix (bytes): the serialized message up to the body
+            suffix (bytes): the serialized message after the body
+            rcpts (List[str]): the addresses that will receive the message
+        """
+        self.email = email
+        self._prefix = prefix
+        self._suffix = suffix
+        self._rcpts = rcpts
+
+    def send(self, body: str) -> Self:
+        """Sends the email with the given body
+
+        Args:
+            body (str): the email's body. It is encoded as text/html, just like Email's body
+
+        Raises:
+            EmailError: if the user has not logged in, or the message was refused for one of the recipients
+
+        Returns:
+            Self: Returns a modified instance for method chaining
+        """
+        payload = b"".join(
+            (
+                _date_header(),
+                self._prefix,
+                base64.encodebytes(body.encode("utf-8")).replace(
+                    b"\n", b"\r\n"
+                ),
+                self._suffix,
+            )
+        )
+
+        self.email._ensure_connected()
+        self.email._deliver(payload, self._rcpts)
+
         return self
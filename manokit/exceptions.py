@@ -14,34 +14,58 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-class NotAValidEmailAddressError(Exception):
-    def __init__(self, *args: object) -> None:
+class ManokitError(Exception):
+    def __init__(self, *args: object, **kwargs: object) -> None:
         """
-        Email address is not valid
+        Base class for Manokit's exceptions.
+
+        If keyword arguments are given, the first positional argument is a message template
+        that is only formatted with them when the exception is converted to a string
         """
         super().__init__(*args)
+        self.kwargs = kwargs
 
     def __str__(self) -> str:
+        if self.kwargs and self.args:
+            return str(self.args[0]).format(**self.kwargs)
+
         return super().__str__()
 
+    def __repr__(self) -> str:
+        if self.kwargs and self.args:
+            return f"{type(self).__name__}({str(self)!r})"
+
+        return super().__repr__()
 
-class AttachmentError(Exception):
-    def __init__(self, *args: object) -> None:
+
+class NotAValidEmailAddressError(ManokitError):
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        """
+        Email address is not valid
+        """
+        super().__init__(*args, **kwargs)
+
+    def __str__(self) -> str:
+        return super().__str__()
+
+
+class AttachmentError(ManokitError):
+    def __init__(self, *args: object, **kwargs: object) -> None:
         """
         An email's attachment is not valid
         """
-        super().__init__(*args)
+        super().__init__(*args, **kwargs)
 
     def __str__(self) -> str:
         return super().__str__()
 
 
-class EmailError(Exception):
-    def __init__(self, *args: object) -> None:
+class EmailError(ManokitError):
+    def __init__(self, *args: object, **kwargs: object) -> None:
         """
         Email cannot be sent
         """
-        super().__init__(*args)
+        super().__init__(*args, **kwargs)
 
     def __str__(self) -> str:
         return super().__str__()
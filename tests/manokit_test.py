@@ -1,10 +1,19 @@
+import base64
+from email import message_from_bytes
 from pathlib import Path
 import shutil
+import smtplib
 import tempfile
 from typing import Callable
 import unittest
+from unittest import mock
 
-from manokit import Email
+from manokit import Email, SMTPPool
+from manokit.exceptions import (
+    AttachmentError,
+    EmailError,
+    NotAValidEmailAddressError,
+)
 
 
 # This suite does not test anything that includes connecting to an SMTP host because it is a security risk
@@ -32,9 +41,8 @@ class ManokitTestCase(unittest.TestCase):
     def test_set_attachment_within_limit(self):
         self.email.add_attachment(self.file_30kb.as_posix())
 
-        assert self.file_30kb.samefile(
-            list(self.email.attachments)[0].as_posix()
-        )
+        assert self.file_30kb.samefile(list(self.email.attachments)[0])
+        assert list(self.email.attachments.values()) == [30]
         assert self.email.available_filesize == 30
 
     @unittest.expectedFailure
@@ -46,6 +54,128 @@ class ManokitTestCase(unittest.TestCase):
         self.email.add_attachment(self.file_30kb.as_posix())  # Now 30kb left
         self.email.add_attachment(self.file_70kb.as_posix())
 
+    def test_set_attachment_through_symlink(self):
+        target = Path(self.tmpdir, "reports", "q3")
+        target.mkdir(parents=True)
+        Path(self.tmpdir, "reports", "30kb.txt").write_text("c" * 20)
+
+        link = Path(self.tmpdir, "q3")
+        try:
+            link.symlink_to(target, target_is_directory=True)
+        except (NotImplementedError, OSError):
+            self.skipTest("symbolic links are not supported")
+
+        # The OS resolves 'q3/..' to 'reports', not to the temporary directory
+        self.email.add_attachment(Path(link, "..", "30kb.txt").as_posix())
+
+        assert list(self.email.attachments.values()) == [20]
+
+    def test_logout_without_login(self):
+        with Email("smtp.google.com", 587) as email:
+            email.add_recipient("buddy@examplecorp.com")
+
+        email.logout()
+
+    def test_send_with_removed_attachment(self):
+        self.email.add_recipient("buddy@examplecorp.com")
+        self.email.add_attachment(self.file_30kb.as_posix())
+        self.file_30kb.unlink()
+
+        with self.assertRaises(AttachmentError):
+            self.email.send()
+
+    def _stub_sending(self):
+        sent = []
+        self.email.author = "me@examplecorp.com"
+        self.email.email_handler = StubHandler()
+        self.email._ensure_connected = lambda: None
+        self.email._deliver = lambda payload, rcpts: sent.append(payload)
+
+        return sent
+
+    def test_send_reuses_cached_message(self):
+        sent = self._stub_sending()
+        self.email.add_recipient("buddy@examplecorp.com")
+        self.email.add_attachment(self.file_30kb.as_posix())
+
+        self.email.send()
+        cached = self.email._message_cache[1]
+        self.email.send()
+
+        assert self.email._message_cache[1] is cached
+        assert sent[0].endswith(cached) and sent[1].endswith(cached)
+
+    def test_send_rebuilds_changed_message(self):
+        self._stub_sending()
+        self.email.add_recipient("buddy@examplecorp.com")
+        self.email.add_attachment(self.file_30kb.as_posix())
+        self.email.send()
+
+        def rebuilt():
+            cached = self.email._message_cache[1]
+            self.email.send()
+            return self.email._message_cache[1] is not cached
+
+        self.email.add_cc("boss@examplecorp.com")
+        assert rebuilt()
+
+        self.email.set_subject("Quarterly report")
+        assert rebuilt()
+
+        self.file_30kb.write_text("c" * 20)
+        assert rebuilt()
+        assert base64.b64encode(b"c" * 20) in self.email._message_cache[1]
+
+    def test_clear_cache(self):
+        self._stub_sending()
+        self.email.add_recipient("buddy@examplecorp.com")
+        self.email.send()
+
+        assert self.email.clear_cache()._message_cache is None
+
+    def test_freeze(self):
+        self.email.author = "me@examplecorp.com"
+        self.email.add_recipient("buddy@examplecorp.com")
+        self.email.add_attachment(self.file_30kb.as_posix())
+
+        frozen = self.email.freeze()
+        body = "<p>Привет</p>"
+        message = message_from_bytes(
+            frozen._prefix
+            + base64.encodebytes(body.encode("utf-8"))
+            + frozen._suffix
+        )
+
+        text, attachment = message.get_payload()
+        assert message["To"] == "buddy@examplecorp.com"
+        assert text.get_content_type() == "text/html"
+        assert text.get_payload(decode=True).decode("utf-8") == body
+        assert attachment.get_filename() == "30kb.txt"
+        assert attachment.get_payload(decode=True) == b"b" * 30
+
+    def test_freeze_placeholder_in_headers(self):
+        self.email.author = "me@examplecorp.com"
+        self.email.add_recipient("buddy@examplecorp.com")
+        self.email.set_subject("\x00MANOKIT_BODY\x00")
+
+        with self.assertRaises(EmailError):
+            self.email.freeze()
+
+    def test_send_partially_refused(self):
+        self.email._transact = lambda payload, rcpts: {
+            "bad@examplecorp.com": (550, b"r")
+        }
+
+        with self.assertRaises(EmailError) as cm:
+            self.email._deliver(
+                b"", ["buddy@examplecorp.com", "bad@examplecorp.com"]
+            )
+
+        assert (
+            str(cm.exception)
+            == "message to bad@examplecorp.com failed (code 550): b'r'"
+        )
+
     def test_set_rec_valid_address(self):
         valid_address = "test@example.edu.ua"
         self.email.add_recipient(valid_address)
@@ -55,6 +185,19 @@ class ManokitTestCase(unittest.TestCase):
         invalid_address = "test@ohmygod......what"
         self.email.add_recipient(invalid_address)
 
+    def test_exception_message_formatting(self):
+        with self.assertRaises(NotAValidEmailAddressError) as cm:
+            self.email.add_recipient("test@ohmygod......what")
+
+        assert (
+            str(cm.exception)
+            == "address test@ohmygod......what has failed validation"
+        )
+        assert (
+            repr(cm.exception)
+            == "NotAValidEmailAddressError('address test@ohmygod......what has failed validation')"
+        )
+
     def test_set_rec_already_in_bcc(self):
         addr = "alreadybcc@examplecorp.com"
 
@@ -64,6 +207,30 @@ class ManokitTestCase(unittest.TestCase):
         self.email.add_recipient(addr)
         assert len(self.email.rec) == 0
 
+    def test_set_multiple_recs(self):
+        self.email.add_bcc("alreadybcc@examplecorp.com")
+        self.email.add_recipients(
+            [
+                "buddy@examplecorp.com",
+                "boss@examplecorp.com",
+                "buddy@examplecorp.com",
+                "alreadybcc@examplecorp.com",
+            ]
+        )
+
+        assert self.email.rec == {
+            "buddy@examplecorp.com",
+            "boss@examplecorp.com",
+        }
+
+    def test_set_multiple_recs_one_invalid(self):
+        with self.assertRaises(NotAValidEmailAddressError):
+            self.email.add_recipients(
+                ["buddy@examplecorp.com", "test@ohmygod......what"]
+            )
+
+        assert len(self.email.rec) == 0
+
     def test_set_cc_already_in_rec(self):
         addr = "alreadybcc@examplecorp.com"
 
@@ -119,3 +286,282 @@ class ManokitTestCase(unittest.TestCase):
         self.email.add_recipient("buddy@examplecorp.com")
         self.email.add_bcc("boss@examplecorp.com")
         self.email.add_bcc("spy@rivalcorp.com")
+
+    def test_set_custom_email_validator_invalid_scope(self):
+        validators = dict(self.email.email_validators)
+
+        with self.assertRaises(ValueError):
+            self.email.set_custom_email_validator(
+                lambda addr: True, ["cc", "everyone"]
+            )
+
+        assert self.email.email_validators == validators
+
+
+class StubSession:
+    """Stands in for an SMTP session, so the pool can be tested without connecting to a host"""
+
+    def __init__(self, alive: bool = True) -> None:
+        self.alive = alive
+        self.closed = False
+
+    def noop(self):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected(
+                "Connection unexpectedly closed"
+            )
+
+        return 250, b"OK"
+
+    def quit(self):
+        self.closed = True
+        return 221, b"Bye"
+
+    def close(self):
+        self.closed = True
+
+
+class StubHandler:
+    """Stands in for an SMTP connection, so transactions can be tested without connecting to a host.
+
+    Every command is answered with the next reply scripted for it, or with a successful reply once they run out.
+    Like a real server, it refuses MAIL FROM while a transaction is still open.
+    """
+
+    does_esmtp = True
+
+    DEFAULT_REPLIES = {
+        "mail": (250, b"OK"),
+        "rcpt": (250, b"OK"),
+        "data": (354, b"Go ahead"),
+        "message": (250, b"Queued"),
+    }
+
+    def __init__(self, extensions=(), **replies) -> None:
+        self.extensions = set(extensions)
+        self.replies = replies
+        self.commands = []
+        self.messages = []
+        self.pending = []
+        self.batches = 0
+        self.in_transaction = False
+        self.sock = object()
+
+    def _reply(self, command):
+        self.commands.append(command)
+
+        if command == "mail" and self.in_transaction:
+            return 503, b"nested MAIL command"
+
+        scripted = self.replies.get(command)
+        code, resp = (
+            scripted.pop(0) if scripted else self.DEFAULT_REPLIES[command]
+        )
+
+        if command == "mail" and code == 250:
+            self.in_transaction = True
+
+        if code == 421:
+            self.close()
+
+        return code, resp
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def has_extn(self, name):
+        return name in self.extensions
+
+    def mail(self, sender, options=()):
+        return self._reply("mail")
+
+    def rcpt(self, recip, options=()):
+        return self._reply("rcpt")
+
+    def send(self, s):
+        self.batches += 1
+        self.pending.extend(line.split()[0] for line in s.splitlines())
+
+    def getreply(self):
+        return self._reply(self.pending.pop(0))
+
+    def data(self, msg):
+        code, resp = self._reply("data")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, resp)
+
+        code, resp = self._reply("message")
+        self.in_transaction = False
+
+        if code == 250:
+            self.messages.append(msg)
+
+        return code, resp
+
+    def rset(self):
+        self.commands.append("rset")
+        self.in_transaction = False
+
+        return 250, b"OK"
+
+    def close(self):
+        self.sock = None
+
+
+class SMTPTransactionTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.email = Email("smtp.google.com", 587)
+        self.email.author = "me@examplecorp.com"
+        self.rcpts = ["buddy@examplecorp.com", "boss@examplecorp.com"]
+
+    def test_transact_sequential(self):
+        handler = StubHandler()
+        self.email.email_handler = handler
+
+        assert self.email._transact(b"message", self.rcpts) == {}
+        assert handler.commands == ["mail", "rcpt", "rcpt", "data", "message"]
+        assert handler.batches == 0
+        assert handler.messages == [b"message"]
+
+    def test_transact_pipelined(self):
+        handler = StubHandler(extensions=["pipelining"])
+        self.email.email_handler = handler
+
+        assert self.email._transact(b"message", self.rcpts) == {}
+        assert handler.commands == ["mail", "rcpt", "rcpt", "data", "message"]
+        assert handler.batches == 1
+        assert handler.messages == [b"message"]
+
+    def test_transact_partially_refused(self):
+        handler = StubHandler(rcpt=[(550, b"No such user")])
+        self.email.email_handler = handler
+
+        errs = self.email._transact(b"message", self.rcpts)
+
+        assert errs == {"buddy@examplecorp.com": (550, b"No such user")}
+        assert handler.messages == [b"message"]
+
+    def test_transact_sender_refused(self):
+        for extensions in ((), ["pipelining"]):
+            with self.subTest(extensions=extensions):
+                handler = StubHandler(extensions, mail=[(550, b"Denied")])
+                self.email.email_handler = handler
+
+                with self.assertRaises(smtplib.SMTPSenderRefused):
+                    self.email._transact(b"message", self.rcpts)
+
+                assert handler.commands[-1] == "rset"
+                assert "data" not in handler.commands
+
+    def test_transact_all_refused(self):
+        handler = StubHandler(
+            ["pipelining"], rcpt=[(550, b"No such user")] * 2
+        )
+        self.email.email_handler = handler
+
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            self.email._transact(b"message", self.rcpts)
+
+        assert handler.commands == ["mail", "rcpt", "rcpt", "rset"]
+
+    def test_transact_closed_by_server(self):
+        handler = StubHandler(rcpt=[(421, b"Closing connection")])
+        self.email.email_handler = handler
+
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            self.email._transact(b"message", self.rcpts)
+
+        assert handler.commands == ["mail", "rcpt"]
+        assert handler.sock is None
+
+    @mock.patch("manokit._RETRY_BACKOFF", 0)
+    def test_retry_transient_data_reply(self):
+        handler = StubHandler(data=[(450, b"Try again later")])
+        self.email.email_handler = handler
+
+        self.email._deliver(b"message", self.rcpts)
+
+        assert handler.commands == [
+            "mail",
+            "rcpt",
+            "rcpt",
+            "data",
+            "rset",
+            "mail",
+            "rcpt",
+            "rcpt",
+            "data",
+            "message",
+        ]
+        assert handler.messages == [b"message"]
+
+    @mock.patch("manokit._RETRY_BACKOFF", 0)
+    def test_retry_closed_session_without_credentials(self):
+        handler = StubHandler(data=[(421, b"Closing connection")])
+        self.email.email_handler = handler
+
+        with self.assertRaises(smtplib.SMTPDataError) as cm:
+            self.email._deliver(b"message", self.rcpts)
+
+        assert cm.exception.smtp_code == 421
+        assert handler.commands.count("mail") == 1
+
+
+class SMTPPoolTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = SMTPPool()
+        self.key = ("smtp.google.com", 587, "me@examplecorp.com", b"", True, 0)
+
+    def test_acquire_empty(self):
+        assert self.pool.acquire(self.key) is None
+
+    def test_acquire_released(self):
+        serv = StubSession()
+        self.pool.release(self.key, serv, 3)
+
+        assert self.pool.acquire(self.key) == (serv, 3)
+        assert self.pool.acquire(self.key) is None
+
+    def test_acquire_skips_dead_session(self):
+        alive, dead = StubSession(), StubSession(alive=False)
+        self.pool.release(self.key, alive)
+        self.pool.release(self.key, dead)
+
+        assert self.pool.acquire(self.key) == (alive, 0)
+        assert dead.closed
+
+    def test_acquire_other_key(self):
+        self.pool.release(self.key, StubSession())
+
+        assert self.pool.acquire(self.key[:-1] + (1,)) is None
+
+    def test_close(self):
+        sessions = [StubSession(), StubSession()]
+        for serv in sessions:
+            self.pool.release(self.key, serv)
+
+        self.pool.close()
+
+        assert all(serv.closed for serv in sessions)
+        assert self.pool.acquire(self.key) is None
+
+    def test_release_idle_limit(self):
+        pool = SMTPPool(max_idle_sessions=2)
+        sessions = [StubSession() for _ in range(3)]
+        for serv in sessions:
+            pool.release(self.key, serv)
+
+        assert [serv.closed for serv in sessions] == [False, False, True]
+        assert pool.acquire(self.key) == (sessions[1], 0)
+        assert pool.acquire(self.key) == (sessions[0], 0)
+        assert pool.acquire(self.key) is None
+
+    def test_release_message_limit(self):
+        pool = SMTPPool(max_messages_per_session=10)
+        worn, fresh = StubSession(), StubSession()
+        pool.release(self.key, worn, 10)
+        pool.release(self.key, fresh, 9)
+
+        assert worn.closed
+        assert pool.acquire(self.key) == (fresh, 9)
+        assert pool.acquire(self.key) is None